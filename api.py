@@ -2,15 +2,21 @@
 Phase 2 — Flask backend API for Eagle Access
 --------------------------------------------
 Exposes REST endpoints to register, delete, list users, and run access verification.
+JSON bodies carry a "kind" field ("access", "message", "error", "status", "task")
+so clients can pick a formatter without inspecting the payload shape. The one
+exception is /list, which keeps returning the bare {user_id: {"name": ...}} map.
 Now includes live registration status tracking for GUI updates.
 """
 
-from flask import Flask, request, jsonify
-from backend import user_manager, photo_capture, embedding_manager, face_recognition
+from flask import Flask, Response, request, jsonify
+from backend import user_manager, photo_capture, embedding_manager, face_recognition, camera
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 import threading
 import atexit
-import cv2
+import time
+import uuid
+import orjson
 
 # --- preload DeepFace model at startup (for faster first request) ---
 from backend.embedding_manager import get_model
@@ -20,16 +26,37 @@ print("[Startup] DeepFace model ready 🧠")
 
 # status tracking for registrations
 registration_status = {}
-status_lock = threading.Lock()
+status_lock = threading.RLock()
+status_changed = threading.Condition(status_lock)  # wakes long-polling /status requests
+TERMINAL_STATUSES = ("completed", "failed")
+MAX_STATUS_WAIT_SEC = 30
+
+# bounded pool for capture + embedding jobs (caps concurrent DeepFace work)
+registration_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="register")
+
+# one webcam is shared by every job: captures and verifications take turns,
+# only the embedding step of a registration overlaps with other work
+camera_session_lock = threading.Lock()
+
+# verification jobs: one worker, since there is only one camera
+access_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="access")
+access_tasks = {}  # task_id -> (Future, submitted monotonic time), for ?async=1 callers
+access_lock = threading.Lock()
+ACCESS_TASK_TTL_SEC = 300  # finished results nobody fetched are dropped after this
 
 app = Flask(__name__)
 
+def _set_status(name, status):
+    with status_changed:
+        registration_status[name] = {"status": status}
+        status_changed.notify_all()
+
 # ---------------------------------------------------------------------
 # BASIC ROUTES
 # ---------------------------------------------------------------------
 @app.route("/")
 def home():
-    return jsonify({"status": "ok", "message": "Eagle backend is alive 🦅"})
+    return jsonify({"kind": "message", "status": "ok", "message": "Eagle backend is alive 🦅"})
 
 # ---------------------------------------------------------------------
 # USER MANAGEMENT
@@ -39,12 +66,23 @@ def list_users():
     users = user_manager.list_users()
     return jsonify(users)
 
+@app.route("/list.ndjson", methods=["GET"])
+def list_users_ndjson():
+    """Streams users as newline-delimited JSON, one {"id", "name"} object per line."""
+    users = user_manager.list_users()
+
+    def generate():
+        for uid, info in users.items():
+            yield orjson.dumps({"id": uid, "name": info["name"]}) + b"\n"
+
+    return Response(generate(), mimetype="application/x-ndjson")
+
 @app.route("/delete/<string:name>", methods=["DELETE"])
 def delete_user(name):
     ok = user_manager.delete_user_record(name)
     if ok:
-        return jsonify({"message": f"User '{name}' deleted"})
-    return jsonify({"error": "User not found"}), 404
+        return jsonify({"kind": "message", "message": f"User '{name}' deleted"})
+    return jsonify({"kind": "error", "error": "User not found"}), 404
 
 # ---------------------------------------------------------------------
 # REGISTER USER (capture + embed)
@@ -57,55 +95,96 @@ def register_user():
     """
     name = request.form.get("name")
     if not name:
-        return jsonify({"error": "Missing 'name' field"}), 400
+        return jsonify({"kind": "error", "error": "Missing 'name' field"}), 400
 
     try:
         uid = user_manager.add_user_record(name)
     except ValueError as e:
-        return jsonify({"error": str(e)}), 400
+        return jsonify({"kind": "error", "error": str(e)}), 400
 
-    with status_lock:
-        registration_status[name] = {"status": "processing"}
+    _set_status(name, "processing")
 
     def process_registration():
         try:
-            raw_dir, cropped_dir, n = photo_capture.capture_user_images(name)
+            with camera_session_lock:
+                raw_dir, cropped_dir, n = photo_capture.capture_user_images(name)
             if n == 0:
                 print("[Register] No frames captured; aborting.")
-                with status_lock:
-                    registration_status[name] = {"status": "failed"}
+                _set_status(name, "failed")
                 return
             embedding_manager.generate_and_save_embeddings_for_user(name, cropped_dir)
             print(f"[Register] Completed registration for {name}")
-            with status_lock:
-                registration_status[name] = {"status": "completed"}
+            _set_status(name, "completed")
         except Exception as e:
             print(f"[Register] Failed for {name}: {e}")
-            with status_lock:
-                registration_status[name] = {"status": "failed"}
+            _set_status(name, "failed")
 
-    threading.Thread(target=process_registration, daemon=True).start()
-    return jsonify({"message": f"User '{name}' registration started", "user_id": uid})
+    registration_executor.submit(process_registration)
+    return jsonify({"kind": "message", "message": f"User '{name}' registration started", "user_id": uid})
 
 # ---------------------------------------------------------------------
 # REGISTRATION STATUS CHECK
 # ---------------------------------------------------------------------
 @app.route("/status/<string:name>", methods=["GET"])
 def registration_status_check(name):
-    with status_lock:
+    """
+    Returns the registration status for `name`.
+    With ?wait=<seconds> (long polling) the request is held until the status
+    becomes completed/failed or the wait elapses, whichever comes first.
+    """
+    wait = min(request.args.get("wait", 0, type=float), MAX_STATUS_WAIT_SEC)
+    with status_changed:
+        if wait > 0 and name in registration_status:
+            status_changed.wait_for(
+                lambda: registration_status[name]["status"] in TERMINAL_STATUSES,
+                timeout=wait,
+            )
         status = registration_status.get(name)
     if not status:
-        return jsonify({"status": "unknown"})
-    return jsonify(status)
+        return jsonify({"kind": "status", "status": "unknown"})
+    return jsonify({"kind": "status", **status})
 
 # ---------------------------------------------------------------------
 # ACCESS VERIFY
 # ---------------------------------------------------------------------
+def _verify_locked():
+    with camera_session_lock:
+        return face_recognition.verify_face_live(show_window=False)
+
 @app.route("/access", methods=["POST"])
 def access():
-    """Runs live face verification and returns the result as JSON."""
-    result = face_recognition.verify_face_live(show_window=False)
-    return jsonify(result)
+    """
+    Runs live face verification and returns the result as JSON.
+    POST /access?async=1 queues the job and returns a task_id immediately
+    instead; poll GET /access/<task_id> for the result.
+    """
+    future = access_executor.submit(_verify_locked)
+    if request.args.get("async") == "1":
+        task_id = uuid.uuid4().hex[:8]
+        now = time.monotonic()
+        with access_lock:
+            # evict abandoned results so the map can't grow without bound
+            for tid, (fut, submitted) in list(access_tasks.items()):
+                if fut.done() and now - submitted > ACCESS_TASK_TTL_SEC:
+                    del access_tasks[tid]
+            access_tasks[task_id] = (future, now)
+        return jsonify({"kind": "task", "task_id": task_id, "status": "processing"}), 202
+    return jsonify({"kind": "access", **future.result()})
+
+@app.route("/access/<string:task_id>", methods=["GET"])
+def access_result(task_id):
+    with access_lock:
+        task = access_tasks.get(task_id)
+        if task is None:
+            return jsonify({"kind": "error", "error": "Unknown task"}), 404
+        future = task[0]
+        if not future.done():
+            return jsonify({"kind": "task", "task_id": task_id, "status": "processing"})
+        del access_tasks[task_id]
+    try:
+        return jsonify({"kind": "access", **future.result()})
+    except Exception as e:
+        return jsonify({"kind": "error", "error": str(e)}), 500
 
 # ---------------------------------------------------------------------
 # CLEANUP ON EXIT
@@ -113,9 +192,7 @@ def access():
 @atexit.register
 def release_camera():
     try:
-        cam = cv2.VideoCapture(0)
-        if cam.isOpened():
-            cam.release()
+        if camera.release_camera():
             print("[Exit] Webcam released successfully 🎥")
     except Exception as e:
         print(f"[Exit] Camera release failed: {e}")
@@ -0,0 +1,74 @@
+"""
+Shared webcam handle.
+- Opens the default camera once (lazily) and reuses it for capture and verification
+- Prefers DirectShow (Windows) / V4L2 (Linux) with MJPG and a 1-frame buffer
+- Released explicitly at process exit
+"""
+
+from __future__ import annotations
+import sys
+import threading
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+_CAM: Optional[cv2.VideoCapture] = None
+_cam_lock = threading.RLock()
+
+
+def _api_preference() -> int:
+    if sys.platform.startswith("win"):
+        return cv2.CAP_DSHOW
+    if sys.platform.startswith("linux"):
+        return cv2.CAP_V4L2
+    return cv2.CAP_ANY
+
+
+def get_camera() -> cv2.VideoCapture:
+    """Open (first call only) and return the shared webcam handle."""
+    global _CAM
+    with _cam_lock:
+        if _CAM is None or not _CAM.isOpened():
+            cap = cv2.VideoCapture(0, _api_preference())
+            if not cap.isOpened():
+                cap = cv2.VideoCapture(0)  # fall back to OpenCV's default backend
+            if not cap.isOpened():
+                raise RuntimeError("Could not access webcam. Check permissions or device.")
+
+            # MJPG avoids the YUY2->BGR conversion and USB bandwidth limits;
+            # a 1-frame buffer keeps reads close to live while frames are being
+            # pulled continuously (after idle time call flush_frames() first).
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            _CAM = cap
+        return _CAM
+
+
+def read_frame() -> Tuple[bool, Optional[np.ndarray]]:
+    """Read one frame from the shared handle (serialized across threads)."""
+    with _cam_lock:
+        return get_camera().read()
+
+
+def flush_frames(n: int = 5) -> None:
+    """
+    Discard up to `n` queued frames. The driver keeps the last frame(s) from
+    before an idle period, so each capture/verify session starts with this.
+    """
+    with _cam_lock:
+        cap = get_camera()
+        for _ in range(n):
+            if not cap.grab():
+                break
+
+
+def release_camera() -> bool:
+    """Release the shared handle. Returns True if a camera was open."""
+    global _CAM
+    with _cam_lock:
+        if _CAM is None:
+            return False
+        _CAM.release()
+        _CAM = None
+        return True
@@ -13,16 +13,52 @@ CROPPED_DIR = Path(os.environ.get("EAGLE_CROPPED_DIR", BASE_DIR / "dataset" / "C
 
 USERS_FILE = Path(os.environ.get("EAGLE_USERS_FILE", BASE_DIR / "users.json"))
 EMBED_FILE = Path(os.environ.get("EAGLE_EMBED_FILE", BASE_DIR / "embeddings.json"))
-LOG_FILE = Path(os.environ.get("EAGLE_LOG_FILE", BASE_DIR / "access_log.json"))
+LOG_FILE = Path(os.environ.get("EAGLE_LOG_FILE", BASE_DIR / "access_log.jsonl"))  # one JSON object per line
+LEGACY_LOG_FILE = LOG_FILE.with_suffix(".json")  # old single JSON array log
+
+# Normalized embedding matrix + ordered names, derived from EMBED_FILE for fast loading
+EMBED_INDEX_FILE = Path(os.environ.get("EAGLE_EMBED_INDEX_FILE", BASE_DIR / "embeddings.npy"))
+EMBED_NAMES_FILE = Path(os.environ.get("EAGLE_EMBED_NAMES_FILE", BASE_DIR / "embeddings_names.json"))
 
 # Create directories/files if not present
+import json
 DATASET_DIR.mkdir(parents=True, exist_ok=True)
-for fpath, default in [(USERS_FILE, {}), (EMBED_FILE, {}), (LOG_FILE, [])]:
+for fpath, default in [(USERS_FILE, {}), (EMBED_FILE, {})]:
     if not fpath.exists():
-        import json
         with open(fpath, "w", encoding="utf-8") as f:
             json.dump(default, f, indent=2)
 
+# One-time migration of the legacy array log to JSON lines. The array file is
+# kept: as-is when it lives next to LOG_FILE, or renamed to <LOG_FILE>.bak when
+# EAGLE_LOG_FILE itself still points at an array-format log.
+def _is_json_array(path: Path) -> bool:
+    try:
+        with open(path, "rb") as f:
+            return f.read(64).lstrip()[:1] == b"["
+    except FileNotFoundError:
+        return False
+
+
+def _migrate_log(src: Path) -> None:
+    try:
+        with open(src, "r", encoding="utf-8") as f:
+            legacy = json.load(f)
+    except json.JSONDecodeError:
+        legacy = []
+    tmp = LOG_FILE.with_name(LOG_FILE.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(entry) + "\n" for entry in legacy)
+    if src == LOG_FILE:
+        os.replace(LOG_FILE, LOG_FILE.with_name(LOG_FILE.name + ".bak"))
+    os.replace(tmp, LOG_FILE)
+
+
+if _is_json_array(LOG_FILE):
+    _migrate_log(LOG_FILE)
+elif not LOG_FILE.exists() and LEGACY_LOG_FILE != LOG_FILE and LEGACY_LOG_FILE.exists():
+    _migrate_log(LEGACY_LOG_FILE)
+LOG_FILE.touch(exist_ok=True)
+
 # ---- Recognition / Capture ----
 FACE_SIZE = (160, 160)  # standard Facenet input
 NUM_IMAGES = int(os.environ.get("EAGLE_NUM_IMAGES", 30))
@@ -31,9 +67,20 @@ CAPTURE_DELAY_SEC = float(os.environ.get("EAGLE_CAPTURE_DELAY_SEC", 0.2))
 # Cosine similarity threshold; higher is more lenient. Typical range ~0.45–0.65 for Facenet512.
 SIMILARITY_THRESHOLD = float(os.environ.get("EAGLE_SIM_THRESHOLD", 0.50))
 
+# Live verification averages up to this many frames, stopping early once the
+# cosine score clears SIMILARITY_THRESHOLD by VERIFY_EARLY_MARGIN.
+VERIFY_MAX_FRAMES = int(os.environ.get("EAGLE_VERIFY_MAX_FRAMES", 5))
+VERIFY_EARLY_MARGIN = float(os.environ.get("EAGLE_VERIFY_EARLY_MARGIN", 0.10))
+
 # OpenCV cascade path (fallback to bundled default)
 import cv2
 FACE_CASCADE_PATH = os.environ.get(
     "EAGLE_FACE_CASCADE_PATH",
     cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
 )
+
+# Optional OpenCV DNN face detector (res10_300x300 SSD, Caffe). When both files are
+# set it replaces the Haar cascade; download them from the OpenCV samples repo.
+FACE_DNN_PROTO_PATH = os.environ.get("EAGLE_FACE_DNN_PROTO")        # deploy.prototxt
+FACE_DNN_MODEL_PATH = os.environ.get("EAGLE_FACE_DNN_MODEL")        # res10_300x300_ssd_iter_140000.caffemodel
+FACE_DNN_CONFIDENCE = float(os.environ.get("EAGLE_FACE_DNN_CONFIDENCE", 0.5))
@@ -1,19 +1,22 @@
 """
 Embedding generation and storage utilities using DeepFace (Facenet512).
 - Builds a single model once (call get_model())
-- Generates embeddings for all images in a folder
+- Generates embeddings for all images in a folder (one batched forward pass)
 - Averages them for stability
-- Reads/writes to embeddings.json
+- Reads/writes to embeddings.json (+ a normalized .npy index for fast loading)
 """
 
 from __future__ import annotations
-import json
+import os
+import threading
 from pathlib import Path
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple
 
+import cv2
 import numpy as np
+import orjson
 from deepface import DeepFace
-from .config import EMBED_FILE
+from .config import EMBED_FILE, EMBED_INDEX_FILE, EMBED_NAMES_FILE, FACE_SIZE
 
 # --------------------------------------------------------------
 # MODEL CACHE (so we don’t rebuild DeepFace model every time)
@@ -30,6 +33,39 @@ def get_model():
     return _model_cache
 
 
+# --------------------------------------------------------------
+# BATCHED FORWARD PASS (bypasses DeepFace.represent per image)
+# --------------------------------------------------------------
+def _preprocess(faces_bgr: List[np.ndarray]) -> np.ndarray:
+    """
+    Stack BGR face crops into a (N, H, W, 3) float32 Facenet512 input batch.
+    Mirrors DeepFace.represent's default "base" normalization (BGR scaled
+    to [0, 1]) so new vectors stay comparable to the stored ones.
+    Crops already at FACE_SIZE (everything photo_capture writes) skip resizing.
+    """
+    h, w = FACE_SIZE[1], FACE_SIZE[0]
+    batch = np.empty((len(faces_bgr), h, w, 3), dtype=np.float32)
+    for i, face in enumerate(faces_bgr):
+        batch[i] = face if face.shape[:2] == (h, w) else cv2.resize(face, FACE_SIZE)
+    batch *= 1.0 / 255.0  # one vectorized pass over the whole batch
+    return batch
+
+
+def embed_faces(faces_bgr: List[np.ndarray]) -> np.ndarray:
+    """
+    Embed already-cropped BGR faces in a single forward pass.
+    Returns an (N, 512) float32 array.
+    """
+    batch = _preprocess(faces_bgr)
+    model = get_model().model  # underlying Keras model
+    # Direct call instead of predict(): one forward pass without the
+    # per-call tf.data/callback setup, which dominates for single frames.
+    return np.asarray(model(batch, training=False).numpy(), dtype=np.float32)
+
+
+_IMAGE_SUFFIXES = frozenset({".jpg", ".jpeg", ".png"})
+
+
 # --------------------------------------------------------------
 # CORE: Compute embeddings for all images in a folder
 # --------------------------------------------------------------
@@ -38,35 +74,33 @@ def compute_embeddings_for_folder(folder: Path) -> List[List[float]]:
     Compute embeddings for all .jpg/.jpeg/.png files in the given folder.
     Returns a list of embedding vectors (Python lists).
     """
-    model = get_model()
     out: List[List[float]] = []
 
     if not folder.exists():
         print(f"[Embed] Folder not found: {folder}")
         return out
 
-    images = sorted([p for p in folder.glob("*") if p.suffix.lower() in {".jpg", ".jpeg", ".png"}])
+    # one directory scan; order is irrelevant since the vectors get averaged
+    images = [p for p in folder.iterdir() if p.suffix.lower() in _IMAGE_SUFFIXES]
     if not images:
         print(f"[Embed] No images found in {folder}")
         return out
 
     print(f"[Embed] Generating embeddings for {len(images)} images in {folder} ...")
 
+    faces = []
     for p in images:
+        img = cv2.imread(str(p))
+        if img is None:
+            print(f"[Embed] Skipping {p.name}: could not read image")
+            continue
+        faces.append(img)
+
+    if faces:
         try:
-            # ✅ No model argument (DeepFace handles it internally)
-            rep = DeepFace.represent(
-                img_path=str(p),
-                model_name="Facenet512",
-                enforce_detection=False
-            )
-
-            if rep and isinstance(rep, list) and "embedding" in rep[0]:
-                out.append(rep[0]["embedding"])
-            else:
-                print(f"[Embed] No embedding returned for {p.name}")
+            out = embed_faces(faces).tolist()
         except Exception as e:
-            print(f"[Embed] Skipping {p.name}: {e}")
+            print(f"[Embed] Batch embedding failed: {e}")
 
     print(f"[Embed] Created {len(out)} embeddings from {len(images)} images.")
     return out
@@ -75,10 +109,10 @@ def compute_embeddings_for_folder(folder: Path) -> List[List[float]]:
 # --------------------------------------------------------------
 # AVERAGING EMBEDDINGS (for more stable matching)
 # --------------------------------------------------------------
-def average_embeddings(embeddings: List[List[float]]) -> List[List[float]]:
+def average_embeddings(embeddings: List[List[float]]) -> List[float]:
     """
-    Averages multiple embeddings into one mean vector.
-    Returns a single-item list containing the averaged embedding.
+    Averages multiple embeddings into one L2-normalized mean vector.
+    Returns the averaged embedding (empty list if there was nothing to average).
     """
     if not embeddings:
         print("[Embed] No embeddings to average.")
@@ -86,39 +120,141 @@ def average_embeddings(embeddings: List[List[float]]) -> List[List[float]]:
 
     arr = np.array(embeddings, dtype=np.float32)
     mean_vec = arr.mean(axis=0)
+    mean_vec /= np.linalg.norm(mean_vec)
     print(f"[Embed] Averaged {len(embeddings)} embeddings into one stable vector.")
-    return [mean_vec.tolist()]
+    return mean_vec.tolist()
+
+
+# --------------------------------------------------------------
+# IN-MEMORY EMBEDDINGS.JSON CACHE
+# --------------------------------------------------------------
+# Parsed embeddings.json, keyed by the file's mtime so outside edits
+# (e.g. user_manager deleting a user) are picked up on the next read.
+_EMBED_DB: Dict[str, Any] = {"mtime": None, "db": {}}
+_embed_lock = threading.Lock()
+
+
+def load_embeddings_db() -> Dict[str, List]:
+    """Return the embeddings.json contents, re-parsing only if the file changed on disk."""
+    try:
+        mtime = EMBED_FILE.stat().st_mtime_ns
+    except FileNotFoundError:
+        return {}
+
+    if mtime != _EMBED_DB["mtime"]:
+        try:
+            db = orjson.loads(EMBED_FILE.read_bytes())
+        except orjson.JSONDecodeError:
+            db = {}
+        _EMBED_DB.update(mtime=mtime, db=db)
+    return _EMBED_DB["db"]
+
+
+def _write_embeddings_db(db: Dict[str, List]) -> None:
+    """Atomically replace embeddings.json (compact orjson) and refresh the cache."""
+    tmp = EMBED_FILE.with_name(EMBED_FILE.name + ".tmp")
+    tmp.write_bytes(orjson.dumps(db))
+    os.replace(tmp, EMBED_FILE)
+    _EMBED_DB.update(mtime=EMBED_FILE.stat().st_mtime_ns, db=db)
 
 
 # --------------------------------------------------------------
 # SAVE USER EMBEDDINGS TO JSON
 # --------------------------------------------------------------
-def save_user_embeddings(user_name: str, embeddings: List[List[float]]) -> int:
+def save_user_embeddings(user_name: str, embedding: List[float]) -> int:
     """
-    Append or replace embeddings for `user_name` in embeddings.json.
-    Returns the number of vectors saved.
+    Append or replace the (averaged) embedding for `user_name` in embeddings.json,
+    stored flat as {name: [512 floats]}.
+    Returns the number of vectors saved (0 or 1).
     """
-    if not embeddings:
+    if not embedding:
         print(f"[Embed] No embeddings to save for {user_name}.")
         return 0
 
-    # Load existing data safely
-    if EMBED_FILE.exists():
-        try:
-            with open(EMBED_FILE, "r", encoding="utf-8") as f:
-                db = json.load(f)
-        except json.JSONDecodeError:
-            db = {}
+    with _embed_lock:
+        # Save (replace old data for that user)
+        db = dict(load_embeddings_db())
+        db[user_name] = embedding
+        _write_embeddings_db(db)
+        write_embedding_index(db)
+
+    print(f"[Embed] ✅ Saved embedding for '{user_name}' to {EMBED_FILE}")
+    return 1
+
+
+def delete_user_embeddings(user_name: str) -> bool:
+    """
+    Remove `user_name` from embeddings.json and rebuild the index.
+    Returns True if the user had an embedding.
+    """
+    with _embed_lock:
+        db = dict(load_embeddings_db())
+        if db.pop(user_name, None) is None:
+            return False
+        _write_embeddings_db(db)
+        write_embedding_index(db)
+    return True
+
+
+# --------------------------------------------------------------
+# NORMALIZED INDEX (embeddings.npy + embeddings_names.json)
+# --------------------------------------------------------------
+def _user_vector(entry: List) -> np.ndarray:
+    """One vector per user; legacy list-of-vectors entries are averaged."""
+    vec = np.asarray(entry, dtype=np.float32)
+    return vec.mean(axis=0) if vec.ndim == 2 else vec
+
+
+def write_embedding_index(db: Dict[str, List]) -> Tuple[List[str], np.ndarray]:
+    """
+    Collapse each user's entry to one L2-normalized vector and persist the
+    stacked (U, 512) matrix as float16 (ample precision for unit-length cosine
+    scoring) plus the ordered names next to EMBED_FILE.
+    Returns (names, float32 matrix).
+    """
+    names = list(db.keys())
+    if names:
+        mat = np.stack([_user_vector(db[n]) for n in names])
+        mat /= np.linalg.norm(mat, axis=1, keepdims=True)
     else:
-        db = {}
+        mat = np.empty((0, 0), dtype=np.float32)
+
+    np.save(EMBED_INDEX_FILE, mat.astype(np.float16))
+    EMBED_NAMES_FILE.write_bytes(orjson.dumps(names))
+    return names, mat
+
 
-    # Save (replace old data for that user)
-    db[user_name] = embeddings
-    with open(EMBED_FILE, "w", encoding="utf-8") as f:
-        json.dump(db, f, indent=2)
+def load_embedding_index() -> Optional[Tuple[List[str], np.ndarray]]:
+    """
+    Load the normalized index written by write_embedding_index() as float32.
+    Returns None if it is missing or older than EMBED_FILE (e.g. after a
+    user was deleted), in which case the caller should rebuild it.
+    """
+    try:
+        json_mtime = EMBED_FILE.stat().st_mtime_ns
+        if min(EMBED_INDEX_FILE.stat().st_mtime_ns, EMBED_NAMES_FILE.stat().st_mtime_ns) < json_mtime:
+            return None
+        names = orjson.loads(EMBED_NAMES_FILE.read_bytes())
+        mat = np.load(EMBED_INDEX_FILE).astype(np.float32)
+    except (OSError, ValueError):
+        return None
+
+    if len(names) != len(mat):
+        return None
+    return names, mat
 
-    print(f"[Embed] ✅ Saved {len(embeddings)} embeddings for '{user_name}' to {EMBED_FILE}")
-    return len(embeddings)
+
+def get_embedding_index() -> Tuple[List[str], np.ndarray]:
+    """
+    Return the normalized index, rebuilding it from embeddings.json if it is
+    missing or stale. Holds the save/delete lock so a concurrent writer can't
+    be overwritten by a rebuild from an older snapshot.
+    """
+    with _embed_lock:
+        index = load_embedding_index()
+        if index is None:
+            index = write_embedding_index(load_embeddings_db())
+        return index
 
 
 # --------------------------------------------------------------
@@ -133,8 +269,8 @@ def generate_and_save_embeddings_for_user(user_name: str, cropped_folder: Path)
     """
     print(f"[Embed] Starting embedding generation for '{user_name}'...")
     embs = compute_embeddings_for_folder(cropped_folder)
-    embs = average_embeddings(embs)
-    saved = save_user_embeddings(user_name, embs)
+    mean_vec = average_embeddings(embs)
+    saved = save_user_embeddings(user_name, mean_vec)
     if saved:
         print(f"[Embed] 🎯 Embedding generation complete for '{user_name}'.")
     else:
@@ -1,101 +1,86 @@
 """
 Live recognition and similarity scoring.
 - Loads stored embeddings
-- Computes live frame embedding
+- Computes live frame embeddings (averaged over a few frames)
 - Compares using cosine, Euclidean, and Manhattan metrics
 """
 
 from __future__ import annotations
-import json
-import time
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Tuple
-import os
+from typing import Dict, List, Optional, Tuple
 
 import cv2
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.preprocessing import Normalizer
-from scipy.spatial.distance import euclidean, cityblock
-from deepface import DeepFace
+import orjson
 
-from .config import EMBED_FILE, SIMILARITY_THRESHOLD, FACE_CASCADE_PATH, FACE_SIZE, LOG_FILE
+from .camera import flush_frames, get_camera, read_frame
+from .config import (
+    EMBED_FILE, SIMILARITY_THRESHOLD, FACE_SIZE, LOG_FILE, VERIFY_MAX_FRAMES, VERIFY_EARLY_MARGIN,
+)
+from .face_detector import detect_largest_face
+from .embedding_manager import embed_faces, get_embedding_index, get_model
 
 
 # ---------------------------------------------------------------------
 # Load Database
 # ---------------------------------------------------------------------
-def _load_db() -> Tuple[List[str], np.ndarray]:
-    """Load embeddings.json and return (names, normalized_embeddings_2d)."""
-    if not Path(EMBED_FILE).exists():
-        raise FileNotFoundError("No embeddings.json found. Please register users first.")
+# Last loaded (names, matrix), keyed by embeddings.json's mtime. Every save or
+# delete rewrites that file, which bumps the mtime and invalidates the cache.
+_DB_CACHE = {"mtime": None, "names": None, "mat": None}
 
-    with open(EMBED_FILE, "r", encoding="utf-8") as f:
-        db = json.load(f)
 
-    if not db:
-        raise RuntimeError("embeddings.json is empty. Register users first.")
+def _load_db() -> Tuple[List[str], np.ndarray]:
+    """Load the normalized embedding index and return (names, normalized_embeddings_2d)."""
+    try:
+        mtime = Path(EMBED_FILE).stat().st_mtime_ns
+    except FileNotFoundError:
+        raise FileNotFoundError("No embeddings.json found. Please register users first.") from None
 
-    names = list(db.keys())
-    mat = []
-    for name in names:
-        vecs = np.asarray(db[name], dtype="float32")
-        mean_vec = vecs.mean(axis=0)
-        mat.append(mean_vec)
-    mat = np.asarray(mat, dtype="float32")
+    if mtime == _DB_CACHE["mtime"]:
+        return _DB_CACHE["names"], _DB_CACHE["mat"]
 
-    in_encoder = Normalizer(norm="l2")
-    mat = in_encoder.transform(mat)
+    names, mat = get_embedding_index()  # rebuilt once if missing or stale
+    if not names:
+        raise RuntimeError("embeddings.json is empty. Register users first.")
+    # C-contiguous float32 keeps the per-frame scoring on a single SGEMV (no copy/upcast)
+    mat = np.ascontiguousarray(mat, dtype=np.float32)
+    _DB_CACHE.update(mtime=mtime, names=names, mat=mat)
     return names, mat
 
 
 # ---------------------------------------------------------------------
 # Face Cropping
 # ---------------------------------------------------------------------
-def _crop_largest_face(frame_bgr: np.ndarray) -> np.ndarray:
-    gray = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2GRAY)
-    cascade = cv2.CascadeClassifier(FACE_CASCADE_PATH)
-    faces = cascade.detectMultiScale(gray, 1.3, 5)
-    if len(faces) == 0:
-        rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
-        return cv2.resize(rgb, FACE_SIZE)
-    x, y, w, h = sorted(faces, key=lambda f: f[2]*f[3], reverse=True)[0]
+def _crop_largest_face(frame_bgr: np.ndarray) -> Optional[np.ndarray]:
+    """RGB crop of the largest face resized to FACE_SIZE, or None if no face was found."""
+    box = detect_largest_face(frame_bgr)
+    if box is None:
+        return None
+    x, y, w, h = box
     face = frame_bgr[y:y+h, x:x+w]
     face_rgb = cv2.cvtColor(face, cv2.COLOR_BGR2RGB)
     return cv2.resize(face_rgb, FACE_SIZE)
 
 
-# ---------------------------------------------------------------------
-# Model Loader
-# ---------------------------------------------------------------------
-_model_cache = None
-def _get_model():
-    global _model_cache
-    if _model_cache is None:
-        print("[DeepFace] Building Facenet512 model (first call only)...")
-        _model_cache = DeepFace.build_model("Facenet512")
-    return _model_cache
-
-
 # ---------------------------------------------------------------------
 # Live Verification
 # ---------------------------------------------------------------------
 def verify_face_live(threshold: float = SIMILARITY_THRESHOLD, show_window: bool = True) -> Dict[str, str]:
     """
     Open webcam once, detect a face, compute embedding, compare to DB.
+    Embeddings from up to VERIFY_MAX_FRAMES frames are averaged before
+    comparing; a clearly confident match returns early.
     Uses cosine similarity as the main decision metric, but logs
     Euclidean and Manhattan distances for analysis.
     """
     names, db_embeds = _load_db()
-    in_encoder = Normalizer(norm="l2")
 
-    cap = cv2.VideoCapture(0)
-    if not cap.isOpened():
-        raise RuntimeError("Could not access webcam.")
+    get_camera()  # shared handle; raises if the webcam is unavailable
+    flush_frames()  # drop frames buffered while the camera sat idle
 
     print("[Access] Eagle is watching...")
-    model = _get_model()
+    get_model()  # shared singleton, normally preloaded by api.py at startup
 
     decision = {
         "status": "denied",
@@ -105,66 +90,70 @@ def verify_face_live(threshold: float = SIMILARITY_THRESHOLD, show_window: bool
         "time": datetime.now().isoformat()
     }
 
-    while True:
-        ok, frame = cap.read()
+    emb_sum = None
+    for _ in range(VERIFY_MAX_FRAMES):
+        ok, frame = read_frame()
         if not ok:
             break
 
         face_rgb = _crop_largest_face(frame)
 
-        try:
-            temp_path = "temp_face.jpg"
-            cv2.imwrite(temp_path, cv2.cvtColor(face_rgb, cv2.COLOR_RGB2BGR))
-
-            rep = DeepFace.represent(
-                img_path=temp_path,
-                model_name="Facenet512",
-                enforce_detection=False,
-            )
-
-            if rep and isinstance(rep, list) and "embedding" in rep[0]:
-                emb = np.asarray(rep[0]["embedding"], dtype="float32").reshape(1, -1)
-                emb = in_encoder.transform(emb)
-                sims = cosine_similarity(emb, db_embeds)[0]
-                max_idx = int(np.argmax(sims))
-
-                # compute all metrics
-                target_vec = db_embeds[max_idx]
-                cos_score = float(sims[max_idx])
-                euclid_score = float(1 / (1 + euclidean(emb.flatten(), target_vec)))
-                manhattan_score = float(1 / (1 + cityblock(emb.flatten(), target_vec)))
-
-                confidence = cos_score
-                decision["scores"] = {
-                    "cosine": round(cos_score, 4),
-                    "euclidean": round(euclid_score, 4),
-                    "manhattan": round(manhattan_score, 4),
-                }
-
-            else:
-                confidence = 0.0
-
-            if confidence > threshold:
-                decision.update({
-                    "status": "granted",
-                    "name": names[max_idx],
-                    "confidence": f"{float(confidence):.4f}"
-                })
-                label = f"{names[max_idx]} ({confidence*100:.1f}%)"
-                color = (0, 255, 0)
-            else:
-                decision.update({
-                    "status": "denied",
-                    "name": "Unknown",
-                    "confidence": f"{float(confidence):.4f}"
-                })
-                label = "Access Denied"
-                color = (0, 0, 255)
-
-        except Exception as e:
-            print(f"[Error] DeepFace embedding failed: {e}")
-            label, color = "No Face / Error", (0, 0, 255)
+        if face_rgb is None:
+            # no face in this frame: keep it out of the running average
+            label, color = "No Face", (0, 0, 255)
             confidence = 0.0
+        else:
+            try:
+                # embed the crop in memory (no temp_face.jpg round-trip)
+                emb = embed_faces([cv2.cvtColor(face_rgb, cv2.COLOR_RGB2BGR)])
+
+                if emb.size:
+                    q = emb.ravel()
+                    q /= np.linalg.norm(q)
+                    # average with earlier frames, then renormalize
+                    emb_sum = q if emb_sum is None else emb_sum + q
+                    q = emb_sum / np.linalg.norm(emb_sum)
+                    # both sides are unit-length, so cosine is a single matvec
+                    sims = db_embeds @ q
+                    max_idx = int(sims.argmax())
+
+                    # compute all metrics against the best match
+                    diff = db_embeds[max_idx] - q
+                    cos_score = float(sims[max_idx])
+                    euclid_score = float(1 / (1 + np.sqrt(diff @ diff)))
+                    manhattan_score = float(1 / (1 + np.abs(diff).sum()))
+
+                    confidence = cos_score
+                    decision["scores"] = {
+                        "cosine": round(cos_score, 4),
+                        "euclidean": round(euclid_score, 4),
+                        "manhattan": round(manhattan_score, 4),
+                    }
+
+                else:
+                    confidence = 0.0
+
+                if confidence > threshold:
+                    decision.update({
+                        "status": "granted",
+                        "name": names[max_idx],
+                        "confidence": f"{float(confidence):.4f}"
+                    })
+                    label = f"{names[max_idx]} ({confidence*100:.1f}%)"
+                    color = (0, 255, 0)
+                else:
+                    decision.update({
+                        "status": "denied",
+                        "name": "Unknown",
+                        "confidence": f"{float(confidence):.4f}"
+                    })
+                    label = "Access Denied"
+                    color = (0, 0, 255)
+
+            except Exception as e:
+                print(f"[Error] DeepFace embedding failed: {e}")
+                label, color = "No Face / Error", (0, 0, 255)
+                confidence = 0.0
 
         if show_window:
             cv2.putText(frame, label, (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
@@ -172,51 +161,18 @@ def verify_face_live(threshold: float = SIMILARITY_THRESHOLD, show_window: bool
             if cv2.waitKey(1) & 0xFF == ord("q"):
                 break
 
-        if confidence > 0.0 or "Unknown" in label:
-            time.sleep(1.5)
+        if confidence > threshold + VERIFY_EARLY_MARGIN:
             break
 
-    cap.release()
     if show_window:
         cv2.destroyAllWindows()
 
+    # Log the decision (append one JSON line; never rewrites history)
     try:
-        os.remove("temp_face.jpg")
-    except:
-        pass
-
-    # Ensure all values are Python-native for JSON
-    decision = _convert_json_safe(decision)
-
-    # Log the decision
-    try:
-        if Path(LOG_FILE).exists():
-            with open(LOG_FILE, "r", encoding="utf-8") as f:
-                log = json.load(f)
-        else:
-            log = []
-        log.append(decision)
-        with open(LOG_FILE, "w", encoding="utf-8") as f:
-            json.dump(log, f, indent=2)
+        with open(LOG_FILE, "ab", buffering=8192) as f:
+            f.write(orjson.dumps(decision, option=orjson.OPT_SERIALIZE_NUMPY) + b"\n")
     except Exception as e:
         print(f"[Log] Failed to write access log: {e}")
 
     print(f"[Access] Decision: {decision}")
     return decision
-
-
-# ---------------------------------------------------------------------
-# JSON-safe conversion helper
-# ---------------------------------------------------------------------
-def _convert_json_safe(obj):
-    """Recursively convert np.float32 and np.ndarray to JSON-safe types."""
-    if isinstance(obj, dict):
-        return {k: _convert_json_safe(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [_convert_json_safe(v) for v in obj]
-    elif isinstance(obj, (np.float32, np.float64)):
-        return float(obj)
-    elif isinstance(obj, np.ndarray):
-        return obj.tolist()
-    else:
-        return obj
@@ -1,12 +1,14 @@
 """
 Photo capture and face preprocessing.
 - Captures N frames from webcam
-- Saves raw frames and cropped/resized face images
+- Saves raw frames and cropped/resized face images on a worker pool, overlapping capture
 - Can be invoked from Flask/Tkinter or CLI
 """
 
 from __future__ import annotations
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Tuple
 
@@ -14,7 +16,11 @@ import cv2
 import numpy as np
 from tqdm import tqdm
 
-from .config import DATASET_DIR, FACE_CASCADE_PATH, FACE_SIZE, NUM_IMAGES, CAPTURE_DELAY_SEC
+from .camera import flush_frames, get_camera, read_frame
+from .config import DATASET_DIR, FACE_SIZE, NUM_IMAGES, CAPTURE_DELAY_SEC
+from .face_detector import detect_largest_face
+
+_JPEG_PARAMS = [cv2.IMWRITE_JPEG_QUALITY, 85]
 
 def _ensure_user_dirs(user_name: str) -> Tuple[Path, Path]:
     root = DATASET_DIR / user_name
@@ -26,51 +32,63 @@ def _ensure_user_dirs(user_name: str) -> Tuple[Path, Path]:
 
 def _crop_largest_face(img_bgr: np.ndarray, face_size: Tuple[int, int]) -> np.ndarray:
     """Detect faces and return an RGB cropped+resized face (largest). Fallback to whole image if none."""
-    gray = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
-    cascade = cv2.CascadeClassifier(FACE_CASCADE_PATH)
-    faces = cascade.detectMultiScale(gray, scaleFactor=1.3, minNeighbors=5)
+    box = detect_largest_face(img_bgr)
 
-    if len(faces) == 0:
+    if box is None:
         # fallback to whole image
         rgb = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
         return cv2.resize(rgb, face_size)
 
-    # choose largest face
-    x, y, w, h = sorted(faces, key=lambda f: f[2]*f[3], reverse=True)[0]
+    # largest face
+    x, y, w, h = box
     face = img_bgr[y:y+h, x:x+w]
     face_rgb = cv2.cvtColor(face, cv2.COLOR_BGR2RGB)
     return cv2.resize(face_rgb, face_size)
 
+def _write_jpeg(path: Path, img_bgr: np.ndarray) -> None:
+    """Encode in memory and write the bytes with one buffered write."""
+    ok, buf = cv2.imencode(".jpg", img_bgr, _JPEG_PARAMS)
+    if not ok:
+        raise RuntimeError(f"JPEG encoding failed for {path}")
+    with open(path, "wb") as f:
+        f.write(buf)
+
+def _save_frame(index: int, frame: np.ndarray, raw_dir: Path, cropped_dir: Path) -> None:
+    """Write the raw frame, then detect/crop/resize the face and write that too."""
+    _write_jpeg(raw_dir / f"img_{index}.jpg", frame)
+    cropped_rgb = _crop_largest_face(frame, FACE_SIZE)
+    cropped_bgr = cv2.cvtColor(cropped_rgb, cv2.COLOR_RGB2BGR)
+    _write_jpeg(cropped_dir / f"img_{index}.jpg", cropped_bgr)
+
 def capture_user_images(user_name: str, num_images: int = NUM_IMAGES, delay_sec: float = CAPTURE_DELAY_SEC) -> Tuple[Path, Path, int]:
     """
     Capture frames from default webcam for the given user.
     Returns (raw_dir, cropped_dir, count_captured).
     """
     raw_dir, cropped_dir = _ensure_user_dirs(user_name)
-    cap = cv2.VideoCapture(0)
-    if not cap.isOpened():
-        raise RuntimeError("Could not access webcam. Check permissions or device.")
+    get_camera()  # raises if the webcam is unavailable
 
     print(f"[Camera] Capturing {num_images} images for '{user_name}' ...")
     time.sleep(2)  # small buffer
+    flush_frames()  # drop frames buffered while the camera sat idle
 
+    # The loop only grabs frames; detect/crop/encode/write run on the pool
+    # (OpenCV releases the GIL) while we wait for the next frame.
     count = 0
-    for i in range(num_images):
-        ok, frame = cap.read()
-        if not ok:
-            print("Warn: Failed to read frame; stopping capture.")
-            break
-
-        raw_path = raw_dir / f"img_{i+1}.jpg"
-        cv2.imwrite(str(raw_path), frame)
-
-        cropped_rgb = _crop_largest_face(frame, FACE_SIZE)
-        cropped_bgr = cv2.cvtColor(cropped_rgb, cv2.COLOR_RGB2BGR)
-        cv2.imwrite(str((cropped_dir / f"img_{i+1}.jpg")), cropped_bgr)
+    futures = []
+    workers = max(1, min(num_images, os.cpu_count() or 1))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for i in range(num_images):
+            ok, frame = read_frame()
+            if not ok:
+                print("Warn: Failed to read frame; stopping capture.")
+                break
+            futures.append(pool.submit(_save_frame, i + 1, frame, raw_dir, cropped_dir))
+            count += 1
+            time.sleep(delay_sec)
 
-        count += 1
-        time.sleep(delay_sec)
+    for fut in futures:
+        fut.result()  # surface any encode/write error
 
-    cap.release()
     print(f"[Camera] Done. Captured {count} frames. Raw: {raw_dir}  Cropped: {cropped_dir}")
     return raw_dir, cropped_dir, count
@@ -4,14 +4,16 @@ Handles creation/deletion in users.json, embeddings.json, and dataset folders.
 """
 
 from __future__ import annotations
-import json
 import shutil
 import uuid
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict
 
-from .config import USERS_FILE, DATASET_DIR, EMBED_FILE
+import orjson
+
+from .config import USERS_FILE, DATASET_DIR
+from .embedding_manager import delete_user_embeddings
 
 
 @dataclass
@@ -25,15 +27,12 @@ class User:
 # ---------------------------------------------------------
 def _read_json(path: Path, default):
     if not path.exists():
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(default, f, indent=2)
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+        _write_json(path, default)
+    return orjson.loads(path.read_bytes())
 
 
 def _write_json(path: Path, data):
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
 
 
 # ---------------------------------------------------------
@@ -95,12 +94,8 @@ def delete_user_record(name_or_id: str) -> bool:
     print(f"[Users] Deleted record for '{user_name}'")
 
     # 2. Remove from embeddings.json
-    if EMBED_FILE.exists():
-        embeds = _read_json(EMBED_FILE, {})
-        if user_name in embeds:
-            del embeds[user_name]
-            _write_json(EMBED_FILE, embeds)
-            print(f"[Cleanup] Removed embeddings for '{user_name}'")
+    if delete_user_embeddings(user_name):
+        print(f"[Cleanup] Removed embeddings for '{user_name}'")
 
     # 3. Remove their dataset folder
     user_root = DATASET_DIR / user_name
@@ -8,13 +8,66 @@ and live registration completion tracking.
 
 import tkinter as tk
 from tkinter import messagebox, scrolledtext
+import asyncio
+import aiohttp
 import requests
+from urllib3.util.retry import Retry
 import json
 import threading
 import time
 from datetime import datetime
+from urllib.parse import quote
 
 BACKEND_URL = "http://127.0.0.1:5000"
+MAX_LOG_LINES = 1000  # older lines are trimmed from the top of the log widget
+FORM_HEADERS = {"Content-Type": "application/x-www-form-urlencoded"}
+SEP = "-" * 55 + "\n"  # log entry separator, built once
+LIST_BATCH_SIZE = 50  # user rows pushed to the log widget per main-loop callback
+
+# Registration status polling limits
+POLL_MAX_ATTEMPTS = 200
+POLL_MAX_CONN_ERRORS = 5        # consecutive connection failures before giving up
+POLL_UNKNOWN_GRACE_SEC = 10     # "unknown"/404 is tolerated this long after registering
+
+
+# -------------------------------------------------------------
+# Response formatters, keyed by the backend's "kind" field
+# -------------------------------------------------------------
+ACCESS_GRANTED_TMPL = "✅ ACCESS GRANTED to {name}\nConfidence: {conf:.2f}%\nTime: {time}"
+ACCESS_DENIED_TMPL = "❌ ACCESS DENIED\nConfidence: {conf:.2f}%\nTime: {time}"
+
+
+def _fmt_access(data: dict) -> str:
+    get = data.get
+    status, name, t = get("status", ""), get("name", ""), get("time", "")
+    conf = float(get("confidence", 0)) * 100
+    tmpl = ACCESS_GRANTED_TMPL if status.lower() == "granted" else ACCESS_DENIED_TMPL
+    return tmpl.format(name=name, conf=conf, time=t)
+
+
+def _fmt_message(data: dict) -> str:
+    return f"🟢 {data['message']}"
+
+
+def _fmt_error(data: dict) -> str:
+    return f"🔴 Error: {data['error']}"
+
+
+def _fmt_users(users: dict) -> str:
+    lines = "\n".join([f"• {v['name']} (ID: {k})" for k, v in users.items()])
+    return f"👥 Registered Users\n{lines}"
+
+
+def _fmt_task(data: dict) -> str:
+    return f"⏳ Task {data['task_id']}: {data['status']}"
+
+
+FORMATTERS = {
+    "access": _fmt_access,
+    "message": _fmt_message,
+    "error": _fmt_error,
+    "task": _fmt_task,
+}
 
 
 class EagleApp(tk.Tk):
@@ -24,6 +77,31 @@ class EagleApp(tk.Tk):
         self.geometry("560x540")
         self.config(bg="#1c1c1c")
 
+        # --- HTTP session (keeps the TCP connection to the backend warm) ---
+        # Connection failures are retried for every method; read/5xx failures only
+        # for idempotent ones, so a flaky link can't register or verify twice.
+        self.session = requests.Session()
+        retry = Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(["GET", "DELETE"]),
+            raise_on_status=False,
+        )
+        adapter = requests.adapters.HTTPAdapter(max_retries=retry, pool_connections=4, pool_maxsize=10)
+        self.session.mount("http://", adapter)
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+
+        # Last /list result ({user_id: {"name": ...}}); None until first fetched
+        self._users_cache = None
+
+        # One background asyncio loop runs every registration poll (no thread per poll).
+        # _aio_session and _polling are only touched from that loop's thread.
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, daemon=True).start()
+        self._aio_session = None
+        self._polling = set()  # names with an active poller (one per name)
+
         # --- Heading ---
         tk.Label(
             self,
@@ -50,10 +128,15 @@ class EagleApp(tk.Tk):
         btn_frame = tk.Frame(self, bg="#1c1c1c")
         btn_frame.pack(pady=10)
 
-        self._make_btn(btn_frame, "Register User", self.register_user, "#38b000").pack(side=tk.LEFT, padx=6)
-        self._make_btn(btn_frame, "Delete User", self.delete_user, "#e63946").pack(side=tk.LEFT, padx=6)
-        self._make_btn(btn_frame, "List Users", self.list_users, "#4361ee").pack(side=tk.LEFT, padx=6)
-        self._make_btn(btn_frame, "Access Eagle", self.access_eagle, "#fcbf49").pack(side=tk.LEFT, padx=6)
+        self.buttons = {
+            "register": self._make_btn(btn_frame, "Register User", self.register_user, "#38b000"),
+            "delete": self._make_btn(btn_frame, "Delete User", self.delete_user, "#e63946"),
+            "list": self._make_btn(btn_frame, "List Users", self.list_users, "#4361ee"),
+            "access": self._make_btn(btn_frame, "Access Eagle", self.access_eagle, "#fcbf49"),
+        }
+        for btn in self.buttons.values():
+            btn.pack(side=tk.LEFT, padx=6)
+        self._inflight = set()  # button keys with a request in flight (main thread only)
 
         # --- Output Log ---
         tk.Label(
@@ -73,6 +156,8 @@ class EagleApp(tk.Tk):
             insertbackground="#00ff00",
         )
         self.output.pack(padx=10, pady=5)
+        self._scroll_pending = False
+        self._ts_cache = (-1, "")  # (epoch second, "HH:MM:SS")
 
         # --- Footer ---
         tk.Label(
@@ -99,118 +184,268 @@ class EagleApp(tk.Tk):
             command=command,
         )
 
+    def _on_close(self):
+        self.session.close()
+        if self._aio_session is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(self._aio_session.close(), self._loop).result(timeout=2)
+            except Exception:
+                pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self.destroy()
+
+    # ---------------------------------------------------------
+    # Threading helpers (network I/O never runs on the Tk main loop)
+    # ---------------------------------------------------------
+    def _async(self, fn, *args, **kwargs):
+        threading.Thread(target=fn, args=args, kwargs=kwargs, daemon=True).start()
+
+    def _start(self, key, fn, *args):
+        """Run fn on a worker with its button disabled until it finishes."""
+        self._inflight.add(key)
+        self.buttons[key].config(state="disabled")
+
+        def run():
+            try:
+                fn(*args)
+            finally:
+                self.after(0, self._finish, key)
+
+        self._async(run)
+
+    def _finish(self, key):
+        self._inflight.discard(key)
+        self.buttons[key].config(state="normal")
+
+    def _log_async(self, payload):
+        """Thread-safe _log: schedule it on the Tk main loop."""
+        self.after(0, self._log, payload)
+
     # ---------------------------------------------------------
     # Backend Interaction (API Calls)
     # ---------------------------------------------------------
     def register_user(self):
+        if "register" in self._inflight:
+            return
         name = self.name_entry.get().strip()
         if not name:
             messagebox.showwarning("Missing Info", "Please enter a user name first.")
             return
         self._log("⏳ Starting registration...")
+        self._start("register", self._do_register, name)
+
+    def _do_register(self, name):
         try:
-            res = requests.post(f"{BACKEND_URL}/register", data={"name": name}, timeout=60)
-            self._log(res.text)
-            # Start polling for registration completion
-            threading.Thread(target=self._poll_registration_status, args=(name,), daemon=True).start()
+            body = f"name={quote(name, safe='')}"  # pre-encoded form body
+            res = self.session.post(f"{BACKEND_URL}/register", data=body, headers=FORM_HEADERS, timeout=60)
+            self._log_async(res)
+            if res.ok:
+                self._users_cache = None  # new user; next delete re-fetches the list
+                # Wait for completion on the poll loop so the button frees up now
+                asyncio.run_coroutine_threadsafe(self._poll_registration_status(name), self._loop)
         except requests.exceptions.ConnectionError:
-            self._log("[Error] Backend not reachable. Is Flask running?")
+            self._log_async("[Error] Backend not reachable. Is Flask running?")
         except Exception as e:
-            self._log(f"[Error] {e}")
+            self._log_async(f"[Error] {e}")
 
-    def _poll_registration_status(self, name):
-        """Continuously poll /status/<name> every 3s until complete."""
-        while True:
+    async def _poll_registration_status(self, name):
+        """Wait for /status/<name> to finish; at most one poller per name."""
+        if name in self._polling:
+            return
+        self._polling.add(name)
+        try:
+            await self._poll_until_done(name)
+        finally:
+            self._polling.discard(name)
+
+    async def _poll_until_done(self, name):
+        """Long-poll /status/<name> (server holds up to 25s), backing off on errors."""
+        if self._aio_session is None:
+            self._aio_session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30))
+        started = time.monotonic()
+        errors = conn_errors = 0
+        for _ in range(POLL_MAX_ATTEMPTS):
             try:
-                res = requests.get(f"{BACKEND_URL}/status/{name}")
-                data = res.json()
-                status = data.get("status")
+                async with self._aio_session.get(
+                    f"{BACKEND_URL}/status/{name}", params={"wait": "25"}
+                ) as res:
+                    conn_errors = 0
+                    status = "unknown" if res.status == 404 else (await res.json(content_type=None)).get("status")
                 if status == "completed":
-                    self._log(f"✅ Registration complete for {name}")
-                    break
+                    self._users_cache = None
+                    self._log_async(f"✅ Registration complete for {name}")
+                    return
                 elif status == "failed":
-                    self._log(f"❌ Registration failed for {name}")
-                    break
+                    self._log_async(f"❌ Registration failed for {name}")
+                    return
+                elif status == "processing":
+                    errors = 0
+                    continue  # server already waited; re-issue immediately
+                elif time.monotonic() - started > POLL_UNKNOWN_GRACE_SEC:
+                    self._log_async(f"❌ Registration failed for {name} (unknown to backend)")
+                    return
+            except aiohttp.ClientConnectionError:
+                conn_errors += 1
+                errors += 1
+                if conn_errors >= POLL_MAX_CONN_ERRORS:
+                    self._log_async(f"[Error] Backend gone; stopped polling for {name}")
+                    return
             except Exception:
-                pass
-            time.sleep(3)
+                errors += 1
+            await asyncio.sleep(min(30, 3 * 1.3 ** errors))
+        self._log_async(f"[Error] Gave up waiting for {name} after {POLL_MAX_ATTEMPTS} attempts")
 
     def delete_user(self):
+        if "delete" in self._inflight:
+            return
         name = self.name_entry.get().strip()
         if not name:
             messagebox.showwarning("Missing Info", "Please enter a user name.")
             return
         self._log("🗑️ Deleting user...")
+        self._start("delete", self._do_delete, name)
+
+    def _do_delete(self, name):
         try:
-            res = requests.delete(f"{BACKEND_URL}/delete/{name}", timeout=15)
-            self._log(res.text)
+            res = self.session.delete(f"{BACKEND_URL}/delete/{name}", timeout=15)
+            self._log_async(res)
             if res.status_code == 200:
-                self._log("🔁 Refreshing user list...")
-                res = requests.get(f"{BACKEND_URL}/list")
-                self._log(res.text)
+                if self._users_cache is None:
+                    self._log_async("🔁 Refreshing user list...")
+                    self._do_list()
+                else:
+                    # drop the user locally instead of re-fetching /list
+                    key = name.lower()
+                    self._users_cache = {
+                        uid: info for uid, info in self._users_cache.items()
+                        if uid != name and info["name"].lower() != key
+                    }
+                    self.after(0, self._render_users, self._users_cache)
         except requests.exceptions.ConnectionError:
-            self._log("[Error] Backend not reachable. Is Flask running?")
+            self._log_async("[Error] Backend not reachable. Is Flask running?")
         except Exception as e:
-            self._log(f"[Error] {e}")
+            self._log_async(f"[Error] {e}")
 
     def list_users(self):
+        if "list" in self._inflight:
+            return
         self._log("📋 Fetching user list...")
+        self._start("list", self._do_list)
+
+    def _do_list(self):
+        """Stream /list.ndjson and render rows in batches as they arrive."""
         try:
-            res = requests.get(f"{BACKEND_URL}/list", timeout=15)
-            self._log(res.text)
+            with self.session.get(f"{BACKEND_URL}/list.ndjson", stream=True, timeout=15) as res:
+                if not res.ok:
+                    # read the body before the with-block closes the stream
+                    self._log_async(res.text)
+                    return
+                self.after(0, self._log_raw, f"[{self._timestamp()}] 👥 Registered Users")
+                users, buf = {}, []
+                for line in res.iter_lines():
+                    if not line:
+                        continue
+                    d = json.loads(line)
+                    users[d["id"]] = {"name": d["name"]}
+                    buf.append(f"• {d['name']} (ID: {d['id']})")
+                    if len(buf) >= LIST_BATCH_SIZE:
+                        self.after(0, self._log_raw, "\n".join(buf))
+                        buf = []
+                if buf:
+                    self.after(0, self._log_raw, "\n".join(buf))
+                self.after(0, self._insert, SEP)
+                self._users_cache = users
         except requests.exceptions.ConnectionError:
-            self._log("[Error] Backend not reachable. Is Flask running?")
+            self._log_async("[Error] Backend not reachable. Is Flask running?")
         except Exception as e:
-            self._log(f"[Error] {e}")
+            self._log_async(f"[Error] {e}")
 
     def access_eagle(self):
+        if "access" in self._inflight:
+            return
         self._log("🧠 Running face verification...")
+        self._start("access", self._do_access)
+
+    def _do_access(self):
         try:
-            res = requests.post(f"{BACKEND_URL}/access", timeout=90)
-            self._log(res.text)
+            res = self.session.post(f"{BACKEND_URL}/access", timeout=90)
+            self._log_async(res)
         except requests.exceptions.ConnectionError:
-            self._log("[Error] Backend not reachable. Is Flask running?")
+            self._log_async("[Error] Backend not reachable. Is Flask running?")
         except Exception as e:
-            self._log(f"[Error] {e}")
+            self._log_async(f"[Error] {e}")
 
     # ---------------------------------------------------------
     # Log Formatting + Display
     # ---------------------------------------------------------
-    def _format_response(self, text: str) -> str:
-        """Beautify JSON or plain text API responses."""
-        try:
-            data = json.loads(text)
-        except Exception:
-            return text
+    def _format_response(self, data) -> str:
+        """Beautify an already-parsed JSON payload; plain strings pass through."""
+        if isinstance(data, str):
+            return data
         if isinstance(data, dict):
-            if "status" in data and "confidence" in data:
-                conf = float(data.get("confidence", 0)) * 100
-                if data["status"].lower() == "granted":
-                    return (
-                        f"✅ ACCESS GRANTED to {data.get('name', '')}\n"
-                        f"Confidence: {conf:.2f}%\n"
-                        f"Time: {data.get('time', '')}"
-                    )
-                else:
-                    return (
-                        f"❌ ACCESS DENIED\n"
-                        f"Confidence: {conf:.2f}%\n"
-                        f"Time: {data.get('time', '')}"
-                    )
-            if "message" in data:
-                return f"🟢 {data['message']}"
-            if "error" in data:
-                return f"🔴 Error: {data['error']}"
-            if all(isinstance(v, dict) and "name" in v for v in data.values()):
-                users = "\n".join([f"• {v['name']} (ID: {k})" for k, v in data.items()])
-                return f"👥 Registered Users\n{users}"
+            fmt = FORMATTERS.get(data.get("kind"))
+            if fmt:
+                return fmt(data)
+            return self._format_legacy(data)
+        return json.dumps(data, indent=2)
+
+    def _format_legacy(self, data: dict) -> str:
+        """Shape-sniffing fallback for responses without a "kind" field."""
+        if "status" in data and "confidence" in data:
+            return _fmt_access(data)
+        if "message" in data:
+            return _fmt_message(data)
+        if "error" in data:
+            return _fmt_error(data)
+        if all(isinstance(v, dict) and "name" in v for v in data.values()):
+            return _fmt_users(data)
         return json.dumps(data, indent=2)
 
-    def _log(self, text: str):
-        """Insert formatted log with timestamp."""
-        now = datetime.now().strftime("%H:%M:%S")
-        formatted = self._format_response(text)
-        self.output.insert(tk.END, f"[{now}] {formatted}\n" + ("-" * 55) + "\n")
+    def _render_users(self, users: dict):
+        """Log a user list straight from a dict (no JSON round-trip)."""
+        self._log(_fmt_users(users))
+
+    def _log(self, payload):
+        """
+        Insert formatted log with timestamp.
+        `payload` is a plain str, parsed JSON, or a requests.Response (parsed
+        only when the server says it is JSON).
+        """
+        if isinstance(payload, requests.Response):
+            if payload.headers.get("Content-Type", "").startswith("application/json"):
+                payload = payload.json()
+            else:
+                payload = payload.text
+        formatted = self._format_response(payload)
+        self._insert(f"[{self._timestamp()}] {formatted}\n{SEP}")
+
+    def _timestamp(self) -> str:
+        """HH:MM:SS, formatted at most once per wall-clock second."""
+        sec = int(time.time())
+        if sec != self._ts_cache[0]:
+            self._ts_cache = (sec, datetime.fromtimestamp(sec).strftime("%H:%M:%S"))
+        return self._ts_cache[1]
+
+    def _log_raw(self, text: str):
+        """Append `text` and a newline to the log widget as-is (main thread only)."""
+        self._insert(text + "\n")
+
+    def _insert(self, text: str):
+        """Single insert of a precomposed chunk, then trim and schedule a scroll."""
+        self.output.insert(tk.END, text)
+        lines = int(self.output.index("end-1c").split(".")[0])
+        if lines > MAX_LOG_LINES:
+            self.output.delete("1.0", f"{lines - MAX_LOG_LINES + 1}.0")
+        self._schedule_scroll()
+
+    def _schedule_scroll(self):
+        """Coalesce scroll-to-end requests into one see() per idle tick."""
+        if not self._scroll_pending:
+            self._scroll_pending = True
+            self.after_idle(self._do_scroll)
+
+    def _do_scroll(self):
+        self._scroll_pending = False
         self.output.see(tk.END)
 
 
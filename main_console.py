@@ -6,14 +6,18 @@ This replaces the old monolithic main.py with clean function calls.
 from __future__ import annotations
 import sys
 
+from backend.camera import release_camera
 from backend.user_manager import add_user_record, delete_user_record, list_users
 from backend.photo_capture import capture_user_images
 from backend.embedding_manager import generate_and_save_embeddings_for_user
 from backend.face_recognition import verify_face_live
 
+# Line reader used by every prompt; swapped for a buffered reader when stdin is piped
+_prompt = input
+
 
 def add_user_flow():
-    name = input("Enter new user's name: ").strip()
+    name = _prompt("Enter new user's name: ").strip()
     try:
         uid = add_user_record(name)
         print(f"Created user {name} (id={uid}).")
@@ -30,7 +34,7 @@ def add_user_flow():
 
 
 def delete_user_flow():
-    key = input("Enter user NAME or ID to delete: ").strip()
+    key = _prompt("Enter user NAME or ID to delete: ").strip()
     ok = delete_user_record(key)
     print("Deleted." if ok else "User not found.")
 
@@ -48,7 +52,39 @@ def access_flow():
     verify_face_live()
 
 
+MENU = {
+    "1": add_user_flow,
+    "2": delete_user_flow,
+    "3": list_users_flow,
+    "4": access_flow,
+}
+
+
+def _make_prompt():
+    """
+    Interactive terminals use input(). When stdin is piped (scripted smoke
+    tests) read it all at once and feed one line per prompt. Like input(),
+    the reader raises EOFError once the lines run out.
+    """
+    if sys.stdin.isatty():
+        return input
+    lines = iter(sys.stdin.read().splitlines())
+
+    def prompt(text: str = "") -> str:
+        print(text, end="")
+        line = next(lines, None)
+        if line is None:
+            print()
+            raise EOFError
+        print(line)
+        return line
+
+    return prompt
+
+
 def main():
+    global _prompt
+    _prompt = _make_prompt()
     while True:
         print("\n🔹 Eagle Phase 1 Console 🔹")
         print("1) Add user (capture + embed)")
@@ -56,19 +92,22 @@ def main():
         print("3) List users")
         print("4) Access (live verify)")
         print("0) Exit")
-        choice = input("> ").strip()
-        if choice == "1":
-            add_user_flow()
-        elif choice == "2":
-            delete_user_flow()
-        elif choice == "3":
-            list_users_flow()
-        elif choice == "4":
-            access_flow()
-        elif choice == "0":
+        try:
+            choice = _prompt("> ").strip()
+        except EOFError:
+            choice = "0"  # end of input at the menu means exit
+        if choice == "0":
             break
+        flow = MENU.get(choice)
+        if flow:
+            try:
+                flow()
+            except EOFError:
+                print("Input ended mid-flow; exiting.")
+                break
         else:
             print("Invalid choice.")
+    release_camera()
 
 
 if __name__ == "__main__":